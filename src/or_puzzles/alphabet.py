@@ -1,22 +1,32 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+from collections import Counter
+
 from ortools.sat.python import cp_model
 
+from or_puzzles.solver import configured_solver
+
 ALPHABET = "abcdefghijklmnopqrstuvwxyz"
 
 
 class Solver:
     def __init__(self) -> None:
         self.model = cp_model.CpModel()
-        self.letters = {k: self.model.new_int_var(1, 26, k) for k in ALPHABET}
+        self.letters = [self.model.new_int_var(1, 26, k) for k in ALPHABET]
+
+    def letter(self, c: str) -> cp_model.IntVar:
+        return self.letters[ord(c) - ord("a")]
 
     def constrain(self, word: str, total: int) -> None:
-        self.model.add(sum(self.letters[c] for c in word) == total)
+        counts = Counter(word)
+        letters = [self.letter(c) for c in counts]
+        expr = cp_model.LinearExpr.weighted_sum(letters, list(counts.values()))
+        self.model.add(expr == total)
 
     def all_constraints(self) -> None:
-        self.model.add_all_different(self.letters.values())
-        self.model.add(self.letters["j"] < 10)
+        self.model.add_all_different(self.letters)
+        self.model.add(self.letter("j") < 10)
 
         self.constrain("ariary", 111)
         self.constrain("birr", 83)
@@ -42,12 +52,12 @@ class Solver:
         self.constrain("zloty", 43)
 
     def solve(self) -> None:
-        solver = cp_model.CpSolver()
+        solver = configured_solver()
         status = solver.solve(self.model)
         assert status == cp_model.OPTIMAL  # type: ignore[comparison-overlap]
 
-        for c in ALPHABET:
-            print(f"{c} = {solver.value(self.letters[c])}")
+        for c, letter in zip(ALPHABET, self.letters, strict=True):
+            print(f"{c} = {solver.value(letter)}")
 
         for word in (
             "bottlecap",
@@ -57,7 +67,7 @@ class Solver:
             "vinderbucks",
             "woolong",
         ):
-            value = sum(solver.value(self.letters[c]) for c in word)
+            value = sum(solver.value(self.letter(c)) for c in word)
             print(f"{word} should be {value}")
 
 
@@ -1,34 +1,42 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
-import itertools
-from dataclasses import dataclass
+import functools
 from typing import TYPE_CHECKING, override
 
 from ortools.sat.python import cp_model
 
-if TYPE_CHECKING:
-    from collections.abc import Hashable, Iterable
-
+from or_puzzles.solver import configured_solver
 
-@dataclass(frozen=True)
-class Cell:
-    x: int
-    y: int
-
-    def __add__(self, other: Cell) -> Cell:
-        return Cell(self.x + other.x, self.y + other.y)
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterable, Iterator
 
 
 class Piece:
-    def __init__(self, cells: Iterable[Cell], *, white: bool) -> None:
+    def __init__(self, mask: int, *, white: bool) -> None:
+        # Bit 8 * y + x of the mask is set iff the piece covers cell x, y.
+        #
         # White indicates whether the cell in the bottom-left corner of the rectangle
         # bounding the piece must be white.
-        self.cells = frozenset(cells)
+        self.mask = mask
         self.white = white
 
+        # Fold the rows on top of one another to find the right-most column.
+        columns = mask | mask >> 32
+        columns |= columns >> 16
+        columns |= columns >> 8
+        self.max_x = (columns & 0xFF).bit_length() - 1
+        self.max_y = (mask.bit_length() - 1) // 8
+
+    @staticmethod
+    def from_cells(cells: Iterable[tuple[int, int]], *, white: bool) -> Piece:
+        mask = 0
+        for x, y in cells:
+            mask |= 1 << (8 * y + x)
+        return Piece(mask, white=white)
+
     def __key(self) -> tuple[Hashable, ...]:
-        return (self.cells, self.white)
+        return (self.mask, self.white)
 
     @override
     def __eq__(self, other: object) -> bool:
@@ -41,74 +49,86 @@ class Piece:
     def __hash__(self) -> int:
         return hash(self.__key())
 
+    def indices(self) -> Iterator[int]:
+        mask = self.mask
+        while mask:
+            lowest = mask & -mask
+            yield lowest.bit_length() - 1
+            mask ^= lowest
+
+    def cells(self) -> Iterator[tuple[int, int]]:
+        return ((index % 8, index // 8) for index in self.indices())
+
     def rotate(self, turns: int) -> Piece:
-        max_x = max(cell.x for cell in self.cells)
-        max_y = max(cell.y for cell in self.cells)
-        cells: Iterable[Cell]
+        max_x = self.max_x
+        max_y = self.max_y
+        cells: Iterable[tuple[int, int]]
 
         if turns == 0:
-            cells = self.cells
-            white = self.white
+            return self
 
-        elif turns == 1:
-            cells = (Cell(cell.y, max_x - cell.x) for cell in self.cells)
+        if turns == 1:
+            cells = ((y, max_x - x) for x, y in self.cells())
             white = self.white ^ (max_x % 2 == 1)
 
         elif turns == 2:
-            cells = (Cell(max_x - cell.x, max_y - cell.y) for cell in self.cells)
+            cells = ((max_x - x, max_y - y) for x, y in self.cells())
             white = self.white ^ ((max_x + max_y) % 2 == 1)
 
         else:
             assert turns == 3
-            cells = (Cell(max_y - cell.y, cell.x) for cell in self.cells)
+            cells = ((max_y - y, x) for x, y in self.cells())
             white = self.white ^ (max_y % 2 == 1)
 
-        return Piece(cells, white=white)
+        return Piece.from_cells(cells, white=white)
 
-    def rotations(self) -> set[Piece]:
-        return {self.rotate(turns) for turns in range(4)}
+    @functools.cached_property
+    def rotations(self) -> frozenset[Piece]:
+        return frozenset(self.rotate(turns) for turns in range(4))
 
-    def add(self, shift: Cell) -> Piece:
-        cells = (cell + shift for cell in self.cells)
-        return Piece(cells, white=self.white)
+    def add(self, shift: int) -> Piece:
+        # Shifting by 8 * dy + dx moves the piece dx right and dy up.  Callers are
+        # responsible for keeping the piece on the board, so that nothing wraps from one
+        # row to the next.
+        return Piece(self.mask << shift, white=self.white)
 
     def shifts(self) -> list[Piece]:
-        max_x = max(cell.x for cell in self.cells)
-        max_y = max(cell.y for cell in self.cells)
-
         # Here is where we enforce matching colours.
         bottom_lefts = (
-            Cell(x, y)
-            for x in range(8 - max_x)
-            for y in range(8 - max_y)
+            8 * y + x
+            for x in range(8 - self.max_x)
+            for y in range(8 - self.max_y)
             if self.white ^ ((x + y) % 2 == 0)
         )
         return [self.add(bottom_left) for bottom_left in bottom_lefts]
 
-    def placements(self) -> list[Piece]:
-        return [piece for rotation in self.rotations() for piece in rotation.shifts()]
+    @functools.cached_property
+    def placements(self) -> tuple[Piece, ...]:
+        return tuple(
+            piece for rotation in self.rotations for piece in rotation.shifts()
+        )
 
 
 PIECES = [
-    Piece({Cell(0, 0), Cell(0, 1), Cell(1, 1), Cell(2, 1)}, white=False),
-    Piece({Cell(0, 0), Cell(1, 0), Cell(1, 1), Cell(2, 1)}, white=False),
-    Piece({Cell(0, 1), Cell(1, 1), Cell(2, 0), Cell(2, 1), Cell(3, 1)}, white=True),
-    Piece({Cell(0, 1), Cell(1, 1), Cell(2, 0), Cell(2, 1)}, white=True),
-    Piece({Cell(0, 1), Cell(1, 0), Cell(1, 1), Cell(2, 0), Cell(3, 0)}, white=False),
-    Piece({Cell(0, 1), Cell(1, 1), Cell(2, 1), Cell(3, 0), Cell(3, 1)}, white=False),
-    Piece({Cell(0, 0), Cell(1, 0), Cell(2, 0), Cell(2, 1), Cell(3, 0)}, white=True),
-    Piece({Cell(0, 1), Cell(0, 2), Cell(1, 1), Cell(2, 0), Cell(2, 1)}, white=True),
-    Piece({Cell(0, 0), Cell(1, 0), Cell(2, 0), Cell(3, 0), Cell(3, 1)}, white=False),
-    Piece({Cell(0, 0), Cell(0, 1), Cell(1, 1), Cell(2, 1), Cell(2, 2)}, white=False),
-    Piece({Cell(0, 0), Cell(1, 0), Cell(1, 1), Cell(2, 1), Cell(3, 1)}, white=False),
-    Piece({Cell(0, 0), Cell(0, 1), Cell(1, 1), Cell(1, 2), Cell(2, 2)}, white=True),
-    Piece({Cell(0, 0), Cell(1, 0), Cell(1, 1)}, white=True),
-    Piece({Cell(0, 0), Cell(1, 0), Cell(1, 1), Cell(2, 0)}, white=False),
+    Piece.from_cells({(0, 0), (0, 1), (1, 1), (2, 1)}, white=False),
+    Piece.from_cells({(0, 0), (1, 0), (1, 1), (2, 1)}, white=False),
+    Piece.from_cells({(0, 1), (1, 1), (2, 0), (2, 1), (3, 1)}, white=True),
+    Piece.from_cells({(0, 1), (1, 1), (2, 0), (2, 1)}, white=True),
+    Piece.from_cells({(0, 1), (1, 0), (1, 1), (2, 0), (3, 0)}, white=False),
+    Piece.from_cells({(0, 1), (1, 1), (2, 1), (3, 0), (3, 1)}, white=False),
+    Piece.from_cells({(0, 0), (1, 0), (2, 0), (2, 1), (3, 0)}, white=True),
+    Piece.from_cells({(0, 1), (0, 2), (1, 1), (2, 0), (2, 1)}, white=True),
+    Piece.from_cells({(0, 0), (1, 0), (2, 0), (3, 0), (3, 1)}, white=False),
+    Piece.from_cells({(0, 0), (0, 1), (1, 1), (2, 1), (2, 2)}, white=False),
+    Piece.from_cells({(0, 0), (1, 0), (1, 1), (2, 1), (3, 1)}, white=False),
+    Piece.from_cells({(0, 0), (0, 1), (1, 1), (1, 2), (2, 2)}, white=True),
+    Piece.from_cells({(0, 0), (1, 0), (1, 1)}, white=True),
+    Piece.from_cells({(0, 0), (1, 0), (1, 1), (2, 0)}, white=False),
 ]
 
 
 class SolutionPrinter(cp_model.CpSolverSolutionCallback):
-    def __init__(self, covers: dict[tuple[int, int], cp_model.IntVar]) -> None:
+    def __init__(self, covers: list[cp_model.LinearExprT]) -> None:
         super().__init__()
         self.covers = covers
         self.solution_count = 0
@@ -116,7 +136,7 @@ class SolutionPrinter(cp_model.CpSolverSolutionCallback):
     def on_solution_callback(self) -> None:
         self.solution_count += 1
         for y in reversed(range(8)):
-            row = [self.value(self.covers[x, y]) for x in range(8)]
+            row = [self.value(self.covers[8 * y + x]) for x in range(8)]
             pretty_row = [f"{index:02d}" for index in row]
             print(" ".join(pretty_row))
         print()
@@ -126,48 +146,42 @@ def main() -> None:
     model = cp_model.CpModel()
 
     # What are the possible placements for each piece?
-    possibilities = {index: piece.placements() for index, piece in enumerate(PIECES)}
+    possibilities = {index: piece.placements for index, piece in enumerate(PIECES)}
 
     # choices[i, j] is true iff we pick possibility j for piece i.
+    #
+    # There are about a thousand of these, so don't spend time naming them.
     choices = {
-        (i, j): model.new_bool_var(f"piece_{i}_{j}")
+        (i, j): model.new_bool_var("")
         for i, placements in possibilities.items()
         for j in range(len(placements))
     }
 
-    # What piece is covering cell x, y?
-    covers = {
-        (x, y): model.new_int_var(0, len(PIECES) - 1, f"cell_{x}_{y}")
-        for x in range(8)
-        for y in range(8)
-    }
-
-    # Placing a piece covers cells.
+    # Which choices are there for each piece, and which would cover each cell?
+    piece_choices: list[list[cp_model.IntVar]] = [[] for _ in PIECES]
+    cell_choices: list[list[tuple[int, cp_model.IntVar]]] = [[] for _ in range(64)]
     for (i, j), choice in choices.items():
-        for cell in possibilities[i][j].cells:
-            model.add(covers[cell.x, cell.y] == i).only_enforce_if(choice)
+        piece_choices[i].append(choice)
+        for index in possibilities[i][j].indices():
+            cell_choices[index].append((i, choice))
 
     # We must choose exactly one placement for each piece
-    for i, placements in possibilities.items():
-        piece_choices = [choices[i, j] for j in range(len(placements))]
-        model.add_exactly_one(piece_choices)
-
-    # We must cover each cell exactly once.
-    for x, y in itertools.product(range(8), range(8)):
-        cell_choices = [
-            choice
-            for (i, j), choice in choices.items()
-            if Cell(x, y) in possibilities[i][j].cells
-        ]
-        model.add_exactly_one(cell_choices)
+    for placement_choices in piece_choices:
+        model.add_exactly_one(placement_choices)
+
+    # We must cover each cell exactly once: so the piece covering it is the one from
+    # the single placement that we chose.  Cells are indexed as 8 * y + x.
+    covers: list[cp_model.LinearExprT] = []
+    for weighted_choices in cell_choices:
+        model.add_exactly_one(choice for _, choice in weighted_choices)
+        covers.append(sum(i * choice for i, choice in weighted_choices))
 
     # Break rotational symmetry.
-    model.add(covers[0, 0] < covers[7, 7])
+    model.add(covers[0] < covers[63])
 
     # Solve.
     solution_printer = SolutionPrinter(covers)
-    solver = cp_model.CpSolver()
-    solver.parameters.enumerate_all_solutions = True
+    solver = configured_solver(enumerate_all_solutions=True)
     solver.solve(model, solution_printer)
     print(f"Found {solution_printer.solution_count} solutions")
 
@@ -3,21 +3,24 @@
 from __future__ import annotations
 
 import itertools
+from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import ClassVar
 
 from ortools.sat.python import cp_model
 
+from or_puzzles.solver import configured_solver
+
 
 @dataclass(frozen=True)
 class Tile:
     LETTERS: ClassVar[str] = "BCFLMRT"
-    symbols: list[int]
+    symbols: tuple[int, ...]
 
     @staticmethod
     def from_string(text: str) -> Tile:
-        symbols = [Tile.LETTERS.index(char) for char in text]
+        symbols = tuple(Tile.LETTERS.index(char) for char in text)
         return Tile(symbols)
 
     def rotate(self, turns: int) -> Tile:
@@ -48,17 +51,42 @@ class SolutionPrinter(cp_model.CpSolverSolutionCallback):
             print("  ".join(pretty_row))
 
     def get_corner(self, x: int, y: int) -> int:
-        return sum(s * self.value(self.corners[x, y, s]) for s in range(7))
+        return next(s for s in range(7) if self.boolean_value(self.corners[x, y, s]))
 
     def get_tile(self, x: int, y: int) -> int:
-        return sum(
-            i * self.value(self.choices[i, x, y, r])
+        # Exactly one choice is made for each cell, so stop as soon as we find it.
+        return next(
+            i
             for i in range(36)
             for r in range(4)
+            if self.boolean_value(self.choices[i, x, y, r])
         )
 
 
-def solve() -> None:
+def greedy_layout(tiles: list[Tile]) -> dict[tuple[int, int], tuple[int, int]]:
+    """Map each cell to a (tile, rotation) that fits with the cells before it"""
+    # This is not expected to solve the puzzle: when nothing fits we just take the first
+    # unused tile.
+    unused = list(range(len(tiles)))
+    symbols: dict[tuple[int, int], int] = {}
+    layout = {}
+    for y, x in itertools.product(range(6), range(6)):
+        corners = [(x, y), (x, y + 1), (x + 1, y + 1), (x + 1, y)]
+        i, r = unused[0], 0
+        for candidate, turns in itertools.product(unused, range(4)):
+            wanted = zip(corners, tiles[candidate].rotate(turns).symbols, strict=True)
+            if all(symbols.get(corner, symbol) == symbol for corner, symbol in wanted):
+                i, r = candidate, turns
+                break
+
+        unused.remove(i)
+        layout[x, y] = (i, r)
+        symbols.update(zip(corners, tiles[i].rotate(r).symbols, strict=True))
+
+    return layout
+
+
+def solve(*, hint: bool = False) -> None:
     puzzle = Path(__file__).parent / "day31.txt"
     data = puzzle.read_text(encoding="utf-8")
 
@@ -67,8 +95,10 @@ def solve() -> None:
     model = cp_model.CpModel()
 
     # choices[i, x, y, r] is true iff we put tile i in cell (x,y) with rotation r.
+    #
+    # There are thousands of these, so don't spend time naming them.
     choices = {
-        (i, x, y, r): model.new_bool_var(f"tile_{i}_{x}_{y}_{r}")
+        (i, x, y, r): model.new_bool_var("")
         for i in range(len(tiles))
         for x in range(6)
         for y in range(6)
@@ -83,33 +113,42 @@ def solve() -> None:
         for s in range(7)
     }
 
-    # Placing a tile puts a symbol in each corner.
+    # Placing a tile puts a symbol in each corner.  While we're here, group the choices
+    # by tile and by cell.
+    rotations = [[tile.rotate(r).symbols for r in range(4)] for tile in tiles]
+    tile_choices: list[list[cp_model.IntVar]] = [[] for _ in tiles]
+    cell_choices: dict[tuple[int, int], list[cp_model.IntVar]] = defaultdict(list)
     for (i, x, y, r), choice in choices.items():
-        tile = tiles[i].rotate(r)
-        model.add_implication(choice, corners[x, y, tile.symbols[0]])
-        model.add_implication(choice, corners[x, y + 1, tile.symbols[1]])
-        model.add_implication(choice, corners[x + 1, y + 1, tile.symbols[2]])
-        model.add_implication(choice, corners[x + 1, y, tile.symbols[3]])
+        symbols = rotations[i][r]
+        model.add_implication(choice, corners[x, y, symbols[0]])
+        model.add_implication(choice, corners[x, y + 1, symbols[1]])
+        model.add_implication(choice, corners[x + 1, y + 1, symbols[2]])
+        model.add_implication(choice, corners[x + 1, y, symbols[3]])
+        tile_choices[i].append(choice)
+        cell_choices[x, y].append(choice)
 
     # We must make exactly one choice for each tile.
-    for i in range(len(tiles)):
-        model.add_exactly_one(
-            choices[i, x, y, r] for x in range(6) for y in range(6) for r in range(4)
-        )
+    for placement_choices in tile_choices:
+        model.add_exactly_one(placement_choices)
 
     # We must make exactly one choice for each cell.
     for x, y in itertools.product(range(6), range(6)):
-        model.add_exactly_one(
-            choices[i, x, y, r] for i in range(len(tiles)) for r in range(4)
-        )
+        model.add_exactly_one(cell_choices[x, y])
 
     # Each corner contains exactly one symbol.
     for x, y in itertools.product(range(7), range(7)):
         model.add_exactly_one(corners[x, y, s] for s in range(7))
 
+    # Optionally start the search from a greedy layout.  This can as easily hurt as
+    # help, so it is off by default.
+    if hint:
+        layout = greedy_layout(tiles)
+        for (i, x, y, r), choice in choices.items():
+            model.add_hint(choice, layout[x, y] == (i, r))
+
     # Solve.
     solution_printer = SolutionPrinter(choices, corners)
-    solver = cp_model.CpSolver()
+    solver = configured_solver()
     solver.solve(model, solution_printer)
 
 
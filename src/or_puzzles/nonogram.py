@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import TYPE_CHECKING
 
 from ortools.sat.python import cp_model
 
+from or_puzzles.solver import configured_solver
+
 if TYPE_CHECKING:
     from collections.abc import Iterable
 
@@ -23,12 +28,16 @@ def constrain_line(
     labels = []
     for clue in clues:
         labels.append(blank)
-        labels.extend([square] * clue)
+        labels.extend(itertools.repeat(square, clue))
 
     # Wrinkle: when we have no clues, we have a single state.
     if not labels:
         labels = [blank]
 
+    # Redundantly, we know how many squares are filled in.
+    filled = labels.count(square)
+    model.add(sum(line) == (len(line) - filled if invert else filled))
+
     # We must go all the way from the start to the end.
     initial_state = 0
     final_state = len(labels) - 1
@@ -62,8 +71,9 @@ def solve_puzzle(
     givens: Iterable[tuple[int, int]] = (),
     *,
     invert_columns: bool = False,
-) -> None:
-    """Solve a puzzle"""
+    num_workers: int | None = None,
+) -> str:
+    """Solve a puzzle, returning a picture of the solution"""
     # Discard pointless clues.
     row_clues = [[clue for clue in clues if clue > 0] for clues in row_clues]
     column_clues = [[clue for clue in clues if clue > 0] for clues in column_clues]
@@ -71,6 +81,8 @@ def solve_puzzle(
     # Count rows and columns.
     num_rows = len(row_clues)
     num_columns = len(column_clues)
+    if num_rows == 0 or num_columns == 0:
+        return "Empty puzzle"
 
     # Sanity check.
     row_fills = (sum(clues) for clues in row_clues)
@@ -81,47 +93,48 @@ def solve_puzzle(
     row_wise = sum(row_fills)
     column_wise = sum(column_fills)
     if row_wise != column_wise:
-        print(f"{row_wise} row fills != {column_wise} column fills")
-        return
+        return f"{row_wise} row fills != {column_wise} column fills"
 
     # Prepare a model.
     model = cp_model.CpModel()
 
-    # squares[i, j]: is square i,j filled in?
-    squares = {
-        (i, j): model.new_bool_var(f"squares_{i}_{j}")
+    # squares[i * num_columns + j]: is square i,j filled in?
+    squares = [
+        model.new_bool_var(f"squares_{i}_{j}")
         for i in range(num_rows)
         for j in range(num_columns)
-    }
+    ]
 
     # Given clues are given.
     for i, j in givens:
-        model.add(squares[i, j] == 1)
+        model.add(squares[i * num_columns + j] == 1)
 
     # Row constraints must be satisfied.
     for i, clues in enumerate(row_clues):
-        line = [squares[i, j] for j in range(num_columns)]
+        line = squares[i * num_columns : (i + 1) * num_columns]
         constrain_line(model, line, clues)
 
     # Column constraints must be satisfied.
     for j, clues in enumerate(column_clues):
-        line = [squares[i, j] for i in range(num_rows)]
+        line = squares[j::num_columns]
         constrain_line(model, line, clues, invert=invert_columns)
 
     # Find a solution.
-    solver = cp_model.CpSolver()
+    solver = configured_solver(num_workers=num_workers)
     status = solver.solve(model)
 
     # Pretty print the solution.
-    if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):  # type: ignore[comparison-overlap]
-        for i in range(num_rows):
-            row = [solver.value(squares[i, j]) for j in range(num_columns)]
-            pretty_row = ["█" if filled else " " for filled in row]
-            print("".join(pretty_row))
-    else:
-        print("No solution found")
+    if status not in (cp_model.FEASIBLE, cp_model.OPTIMAL):  # type: ignore[comparison-overlap]
+        return "No solution found"
 
-    print()
+    pretty_rows = []
+    for i in range(num_rows):
+        line = squares[i * num_columns : (i + 1) * num_columns]
+        row = [solver.value(square) for square in line]
+        pretty_row = ["█" if filled else " " for filled in row]
+        pretty_rows.append("".join(pretty_row))
+
+    return "\n".join(pretty_rows) + "\n"
 
 
 RED1 = [
@@ -413,11 +426,28 @@ L31_COLS = [
 ]
 
 
+def solve_red_and_blue() -> None:
+    """Solve the red and blue puzzles side by side, sharing out the CPUs"""
+    puzzles = [(RED1, BLUE3), (RED2, BLUE1), (RED3, BLUE2)]
+    num_workers = max(1, (os.cpu_count() or 1) // len(puzzles))
+    with ProcessPoolExecutor(max_workers=len(puzzles)) as executor:
+        futures = [
+            executor.submit(
+                solve_puzzle,
+                row_clues,
+                column_clues,
+                invert_columns=True,
+                num_workers=num_workers,
+            )
+            for row_clues, column_clues in puzzles
+        ]
+        for future in futures:
+            print(future.result())
+
+
 def main() -> None:
-    solve_puzzle(L31_ROWS, L31_COLS)
-    # solve_puzzle(RED1, BLUE3, invert_columns=True)
-    # solve_puzzle(RED2, BLUE1, invert_columns=True)
-    # solve_puzzle(RED3, BLUE2, invert_columns=True)
+    print(solve_puzzle(L31_ROWS, L31_COLS))
+    # solve_red_and_blue()
 
 
 if __name__ == "__main__":
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 from ortools.sat.python import cp_model
 
+from or_puzzles.solver import configured_solver
+
 
 def solve_puzzle() -> None:
     """Solve a puzzle"""
@@ -76,7 +78,7 @@ def solve_puzzle() -> None:
     model.add(swallow == house)
 
     # We want to know everything...
-    solver = cp_model.CpSolver()
+    solver = configured_solver()
     status = solver.solve(model)
     if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):  # type: ignore[comparison-overlap]
         print()
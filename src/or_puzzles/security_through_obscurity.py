@@ -20,6 +20,8 @@ from typing import TYPE_CHECKING
 
 from ortools.sat.python import cp_model
 
+from or_puzzles.solver import configured_solver
+
 if TYPE_CHECKING:
     from collections.abc import Iterable
 
@@ -34,6 +36,8 @@ KNIGHT_MOVES = [
     (2, 1),
 ]
 SUITS = ["C", "D", "H", "S"]
+CARD_TABLE = [(card, card % 10, card // 10) for card in range(40)]
+PRETTY = [f"{card % 10}{SUITS[card // 10]}" for card in range(40)]
 
 
 def neighbours(square: int) -> Iterable[int]:
@@ -52,25 +56,26 @@ def neighbours(square: int) -> Iterable[int]:
         yield new_square
 
 
+NEIGHBOURS = [tuple(neighbours(square)) for square in range(36)]
+NEIGHBOUR_DOMAINS = [cp_model.Domain.FromValues(squares) for squares in NEIGHBOURS]
+ADJACENT = cp_model.Domain.FromValues([-6, -1, 1, 6])
+NINETEEN_SEVENTY_FIVE = cp_model.Domain.FromValues([1, 9, 7, 5])
+SEVEN_OR_EIGHT = cp_model.Domain.FromValues([7, 8])
+NONCOMPOSITE = cp_model.Domain.FromValues([0, 1, 2, 3, 5, 7])
+EVENS = cp_model.Domain.FromValues([0, 2, 4, 6, 8])
+
+
 class SolutionPrinter(cp_model.CpSolverSolutionCallback):
     def __init__(self, cards: list[cp_model.IntVar]) -> None:
         super().__init__()
         self.cards = cards
 
-    def pretty(self, card: cp_model.IntVar) -> str:
-        value = self.Value(card)
-        face = value % 10
-        suit = SUITS[value // 10]
-        return f"{face}{suit}"
-
     def on_solution_callback(self) -> None:
+        pretty_cards = [PRETTY[self.value(card)] for card in self.cards]
         for row in range(6):
-            cards = self.cards[row * 6 : (row + 1) * 6]
-            pretty_cards = [f"{self.pretty(card)}" for card in cards]
-            print(" ".join(pretty_cards))
+            print(" ".join(pretty_cards[row * 6 : (row + 1) * 6]))
 
-        pretty_pin = [f"{self.pretty(card)}" for card in self.cards[-4:]]
-        pin = " ".join(pretty_pin)
+        pin = " ".join(pretty_cards[-4:])
         print(f"PIN: {pin}\n")
 
 
@@ -82,12 +87,12 @@ def solve() -> None:
     next_hop = [model.new_int_var(0, 35, f"next_hop_{i}") for i in range(36)]
 
     model.add_all_different(route)
+
+    # The route already makes next_hop a permutation, but saying so prunes much better.
     model.add_all_different(next_hop)
 
     for i in range(36):
-        candidates = neighbours(i)
-        domain = cp_model.Domain.FromValues(list(candidates))
-        model.add_linear_expression_in_domain(next_hop[i], domain)
+        model.add_linear_expression_in_domain(next_hop[i], NEIGHBOUR_DOMAINS[i])
         model.add_element(route[i - 1], next_hop, route[i])
 
     # What is the sequence of cards that we lay?
@@ -106,15 +111,11 @@ def solve() -> None:
     model.add_all_different(squares)
     model.add_inverse(cards, squares)
 
-    # Face values on each square, again with four at the end for the PIN.
+    # Face values and suits on each square, again with four at the end for the PIN.
     faces = [model.new_int_var(0, 9, f"face_{i}") for i in range(40)]
-    for i in range(40):
-        model.add_modulo_equality(faces[i], cards[i], 10)
-
-    # Suits on each square, again with four at the end for the PIN.
     suits = [model.new_int_var(0, 3, f"suit_{i}") for i in range(40)]
     for i in range(40):
-        model.add_division_equality(suits[i], cards[i], 10)
+        model.add_allowed_assignments([cards[i], faces[i], suits[i]], CARD_TABLE)
 
     # One card from each suit is taken for the PIN.
     #
@@ -136,10 +137,9 @@ def solve() -> None:
     # The constraint here is weaker than what we are told, but it's easy and sufficient.
     for card in (6, 9, 13, 18, 31, 39):
         model.add(squares[card] < 36)
-    adjacent = cp_model.Domain.FromValues([-6, -1, 1, 6])
-    model.add_linear_expression_in_domain(squares[6] - squares[9], adjacent)
-    model.add_linear_expression_in_domain(squares[13] - squares[18], adjacent)
-    model.add_linear_expression_in_domain(squares[31] - squares[39], adjacent)
+    model.add_linear_expression_in_domain(squares[6] - squares[9], ADJACENT)
+    model.add_linear_expression_in_domain(squares[13] - squares[18], ADJACENT)
+    model.add_linear_expression_in_domain(squares[31] - squares[39], ADJACENT)
 
     # Threes and nines in the grid are all on or orthogonally adjacent to a corner.
     for i in range(36):
@@ -148,8 +148,7 @@ def solve() -> None:
             model.add(faces[i] != 9)
 
     # Diamond PIN is from 1975, the others aren't.
-    nineteenseventyfive = cp_model.Domain.FromValues([1, 9, 7, 5])
-    model.add_linear_expression_in_domain(faces[-2], nineteenseventyfive)
+    model.add_linear_expression_in_domain(faces[-2], NINETEEN_SEVENTY_FIVE)
     for i in (-1, -3, -4):
         model.add(faces[i] != 1)
         model.add(faces[i] != 9)
@@ -160,26 +159,21 @@ def solve() -> None:
     model.add_all_different(suits[i] for i in (14, 15, 20, 21))
 
     # The central four squares only contain sevens and eights.
-    seven_or_eight = cp_model.Domain.FromValues([7, 8])
     for i in (14, 15, 20, 21):
-        model.add_linear_expression_in_domain(faces[i], seven_or_eight)
+        model.add_linear_expression_in_domain(faces[i], SEVEN_OR_EIGHT)
 
     # The third row from the top contains no composite numbers.
-    noncomposite = cp_model.Domain.FromValues([0, 1, 2, 3, 5, 7])
     for i in range(12, 18):
-        model.add_linear_expression_in_domain(faces[i], noncomposite)
+        model.add_linear_expression_in_domain(faces[i], NONCOMPOSITE)
 
     # The fourth row from the top contains no odd numbers.
-    evens = cp_model.Domain.FromValues([0, 2, 4, 6, 8])
     for i in range(18, 24):
-        model.add_linear_expression_in_domain(faces[i], evens)
+        model.add_linear_expression_in_domain(faces[i], EVENS)
 
     # Sum of each row is greater than the row above it.
-    this_sum = sum(faces[:6])
+    row_sums = [sum(faces[r * 6 : (r + 1) * 6]) for r in range(6)]
     for r in range(1, 6):
-        prev_sum = this_sum
-        this_sum = sum(faces[r * 6 : (r + 1) * 6])
-        model.add(prev_sum < this_sum)
+        model.add(row_sums[r - 1] < row_sums[r])
 
     # After the event we learned that the clue we missed was:
     #
@@ -193,11 +187,13 @@ def solve() -> None:
     # Not having that we instead just broke left-right symmetry:
     model.add(cards[0] < cards[5])
 
+    # Decide the tour first, square by square.
+    model.add_decision_strategy(route, cp_model.CHOOSE_FIRST, cp_model.SELECT_MIN_VALUE)
+
     # Solve.
     solution_printer = SolutionPrinter(cards)
-    solver = cp_model.CpSolver()
-    solver.parameters.enumerate_all_solutions = True
-    solver.parameters.search_branching = cp_model.PORTFOLIO_SEARCH
+    solver = configured_solver(enumerate_all_solutions=True)
+    solver.parameters.search_branching = cp_model.FIXED_SEARCH
     solver.solve(model, solution_printer)
 
 
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from ortools.sat.python import cp_model
+
+
+def configured_solver(
+    *,
+    enumerate_all_solutions: bool = False,
+    num_workers: int | None = None,
+) -> cp_model.CpSolver:
+    """Make a solver, keeping to a single worker if we are enumerating solutions"""
+    solver = cp_model.CpSolver()
+    if enumerate_all_solutions:
+        solver.parameters.enumerate_all_solutions = True
+
+        # Parallel workers report the same solution more than once when enumerating.
+        solver.parameters.num_workers = 1
+    elif num_workers is not None:
+        solver.parameters.num_workers = num_workers
+
+    return solver